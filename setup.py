@@ -4,4 +4,9 @@ setup(
     name="mongo_visitor_admin",
     version="1.0.0",
     packages=find_packages(),
+    entry_points={
+        "console_scripts": [
+            "visitor-admin=visitor_admin.cli:main",
+        ],
+    },
 )
@@ -0,0 +1,274 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from bson import ObjectId
+from pymongo.errors import ServerSelectionTimeoutError
+from visitor_admin.cli import main
+
+STARTUP_TIME_BUDGET = 0.1
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.visitor = {
+            "_id": ObjectId("60e4f5c7c2e6e6a4b3e0e4f5"),
+            "visitor_name": "John Doe",
+            "visitor_age": 25,
+            "visit_date": "2021-07-01",
+            "visit_time": "10:00",
+            "assistant_name": "Jane Doe",
+            "comments": "First visit",
+        }
+
+    def run_cli(self, argv):
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            exit_code = main(argv)
+        return exit_code, mock_stdout.getvalue()
+
+    def test_import_does_not_load_driver(self):
+        script = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import visitor_admin.cli\n"
+            "print(time.perf_counter() - start)\n"
+            "print(any(m.split('.')[0] in ('pymongo', 'bson') for m in sys.modules))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+
+        self.assertLess(float(output[0]), STARTUP_TIME_BUDGET)
+        self.assertEqual(output[1], "False")
+
+    def test_help_does_not_connect(self):
+        result = subprocess.run(
+            [sys.executable, "-m", "visitor_admin", "--help"],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "MONGODB_URI": "mongodb://unreachable:1"},
+        )
+
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("visitor-admin", result.stdout)
+
+    @patch("visitor_admin.visitor_index.create_visitor")
+    def test_create(self, mock_create_visitor):
+        mock_create_visitor.return_value = "Visitor has been created successfully"
+
+        exit_code, output = self.run_cli(
+            [
+                "create",
+                "--visitor-name",
+                "John Doe",
+                "--visitor-age",
+                "25",
+                "--visit-date",
+                "2021-07-01",
+                "--visit-time",
+                "10:00",
+                "--assistant-name",
+                "Jane Doe",
+                "--comments",
+                "First visit",
+            ]
+        )
+
+        self.assertEqual(exit_code, 0)
+        mock_create_visitor.assert_called_once_with(
+            "John Doe",
+            25,
+            "2021-07-01",
+            "10:00",
+            "Jane Doe",
+            "First visit",
+            profile=None,
+        )
+        self.assertEqual(output, "Visitor has been created successfully\n")
+
+    @patch("visitor_admin.visitor_index.upsert_visitor")
+    def test_create_upsert(self, mock_upsert_visitor):
+        self.run_cli(
+            [
+                "create",
+                "--upsert",
+                "--visitor-name",
+                "John Doe",
+                "--visitor-age",
+                "25",
+                "--visit-date",
+                "2021-07-01",
+                "--visit-time",
+                "10:00",
+                "--assistant-name",
+                "Jane Doe",
+                "--comments",
+                "First visit",
+            ]
+        )
+
+        mock_upsert_visitor.assert_called_once_with(
+            "John Doe",
+            25,
+            "2021-07-01",
+            "10:00",
+            "Jane Doe",
+            "First visit",
+            profile=None,
+        )
+
+    @patch("visitor_admin.visitor_index.create_visitor_indexes")
+    def test_indexes(self, mock_create_visitor_indexes):
+        self.run_cli(["indexes"])
+        mock_create_visitor_indexes.assert_called_with(False)
+
+        self.run_cli(["indexes", "--unique-visits"])
+        mock_create_visitor_indexes.assert_called_with(True)
+
+    @patch("visitor_admin.visitor_index.stream_visitors")
+    def test_list(self, mock_stream_visitors):
+        mock_stream_visitors.return_value = iter([self.visitor])
+
+        exit_code, output = self.run_cli(
+            ["--profile", "analytics", "list", "--batch-size", "10"]
+        )
+
+        self.assertEqual(exit_code, 0)
+        mock_stream_visitors.assert_called_once_with(10, "analytics")
+        self.assertEqual(json.loads(output)["_id"], str(self.visitor["_id"]))
+
+    @patch("visitor_admin.visitor_index.visitor_details_many")
+    @patch("visitor_admin.visitor_index.visitor_details")
+    def test_details(self, mock_visitor_details, mock_visitor_details_many):
+        visitor_id = str(self.visitor["_id"])
+        mock_visitor_details.return_value = self.visitor
+        mock_visitor_details_many.return_value = [self.visitor, self.visitor]
+
+        _, output = self.run_cli(["details", visitor_id])
+        mock_visitor_details.assert_called_once_with(visitor_id, None)
+        self.assertEqual(json.loads(output)["_id"], visitor_id)
+
+        _, output = self.run_cli(["details", visitor_id, visitor_id])
+        mock_visitor_details_many.assert_called_once_with(
+            [visitor_id, visitor_id], None
+        )
+        self.assertEqual(len(output.splitlines()), 2)
+
+    @patch("visitor_admin.visitor_index.update_visitor")
+    def test_update(self, mock_update_visitor):
+        visitor_id = str(self.visitor["_id"])
+
+        self.run_cli(["update", visitor_id, "--comments", "Sixth visit"])
+
+        mock_update_visitor.assert_called_once_with(
+            visitor_id, {"comments": "Sixth visit"}, None
+        )
+
+    @patch("visitor_admin.visitor_index.update_visitor")
+    def test_update_without_fields(self, mock_update_visitor):
+        with patch("sys.stderr", new_callable=io.StringIO) as mock_stderr:
+            exit_code, _ = self.run_cli(["update", str(self.visitor["_id"])])
+
+        self.assertEqual(exit_code, 1)
+        mock_update_visitor.assert_not_called()
+        self.assertEqual(
+            mock_stderr.getvalue(),
+            "Error: At least one field to update must be given\n",
+        )
+
+    @patch("visitor_admin.visitor_index.delete_all")
+    @patch("visitor_admin.visitor_index.delete_visitor")
+    def test_delete(self, mock_delete_visitor, mock_delete_all):
+        visitor_id = str(self.visitor["_id"])
+
+        self.run_cli(["delete", visitor_id])
+        mock_delete_visitor.assert_called_once_with(visitor_id, None)
+
+        self.run_cli(["delete", "--all"])
+        mock_delete_all.assert_called_once_with(None)
+
+    @patch("visitor_admin.visitor_index.stream_visitors")
+    @patch("visitor_admin.visitor_index.create_visitors")
+    def test_export_then_import(self, mock_create_visitors, mock_stream_visitors):
+        mock_stream_visitors.return_value = iter([self.visitor])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "visitors.jsonl")
+            self.run_cli(["export", path])
+            self.run_cli(["--profile", "fast_ingest", "import", path])
+
+        imported_visitors, profile = mock_create_visitors.call_args.args
+        self.assertEqual(profile, "fast_ingest")
+        self.assertEqual(mock_create_visitors.call_args.kwargs, {"validate": True})
+        self.assertEqual(len(imported_visitors), 1)
+        self.assertEqual(imported_visitors[0]["visitor_name"], "John Doe")
+
+    @patch("visitor_admin.visitor_index.create_visitors")
+    def test_import_trusted(self, mock_create_visitors):
+        with patch("sys.stdin", io.StringIO(json.dumps({"visitor_name": "J"}))):
+            self.run_cli(["import", "--trusted", "-"])
+
+        mock_create_visitors.assert_called_once_with(
+            [{"visitor_name": "J"}], None, validate=False
+        )
+
+    @patch("visitor_admin.visitor_index.create_visitor_collection")
+    def test_collection(self, mock_create_visitor_collection):
+        self.run_cli(["collection"])
+        mock_create_visitor_collection.assert_called_once_with()
+
+    def test_details_with_invalid_id(self):
+        with patch("sys.stderr", new_callable=io.StringIO) as mock_stderr:
+            exit_code, _ = self.run_cli(["details", "notanid"])
+
+        self.assertEqual(exit_code, 1)
+        self.assertTrue(mock_stderr.getvalue().startswith("Error: 'notanid'"))
+
+    @patch("visitor_admin.visitor_index.visitor_stats")
+    def test_server_error(self, mock_visitor_stats):
+        mock_visitor_stats.side_effect = ServerSelectionTimeoutError(
+            "localhost:27017: connection refused"
+        )
+
+        with patch("sys.stderr", new_callable=io.StringIO) as mock_stderr:
+            exit_code, _ = self.run_cli(["stats"])
+
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(
+            mock_stderr.getvalue(), "Error: localhost:27017: connection refused\n"
+        )
+
+    def test_missing_import_file(self):
+        with patch("sys.stderr", new_callable=io.StringIO) as mock_stderr:
+            exit_code, _ = self.run_cli(["import", "/nonexistent/visitors.jsonl"])
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn("No such file or directory", mock_stderr.getvalue())
+
+    @patch("visitor_admin.visitor_index.visitor_stats")
+    def test_unexpected_error_is_raised(self, mock_visitor_stats):
+        mock_visitor_stats.side_effect = KeyError("visits_per_day")
+
+        with self.assertRaises(KeyError):
+            self.run_cli(["stats"])
+
+    @patch("visitor_admin.visitor_index.visitor_stats")
+    def test_stats(self, mock_visitor_stats):
+        stats = {"total_visitors": 1, "visits_per_day": {"2021-07-01": 1}}
+        mock_visitor_stats.return_value = stats
+
+        _, output = self.run_cli(["stats"])
+
+        self.assertEqual(json.loads(output), stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+import mongomock
+from bson import ObjectId
+from visitor_admin.query_cache import QueryCache
+from visitor_admin.visitor_index import (
+    validate_visitor_fields,
+    get_visitor_details,
+    run_concurrently,
+    visitor_details_many,
+    list_visitors,
+    create_visitor,
+)
+
+THREAD_COUNT = 32
+OPERATION_LATENCY = 0.005
+
+
+class TestConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.visitors_list = [
+            {
+                "_id": ObjectId(),
+                "visitor_name": f"Visitor {number}",
+                "visitor_age": 20 + number,
+                "visit_date": "2021-07-01",
+                "visit_time": f"{number % 24:02d}:00",
+                "assistant_name": "Jane Doe",
+                "comments": "First visit",
+            }
+            for number in range(THREAD_COUNT * 2)
+        ]
+        self.visitor_ids = [str(visitor["_id"]) for visitor in self.visitors_list]
+
+    def setup_mock_visitors(self, mock_connection_manager):
+        mock_visitors = mongomock.MongoClient()["CompanyName"]["Visitor"]
+        mock_connection_manager.return_value.__enter__.return_value = mock_visitors
+        mock_visitors.insert_many(self.visitors_list)
+        return mock_visitors
+
+    def run_in_threads(self, function, arguments):
+        with ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+            return list(executor.map(function, arguments))
+
+    def test_validation_under_threads(self):
+        def validate(number):
+            visitor_age = number if number % 2 else str(number)
+            try:
+                validate_visitor_fields(
+                    "John Doe", visitor_age, "2021-07-01", "10:00", "Jane", "Hi"
+                )
+            except TypeError:
+                return False
+            return True
+
+        results = self.run_in_threads(validate, range(1, THREAD_COUNT * 8))
+
+        self.assertEqual(
+            results, [number % 2 == 1 for number in range(1, THREAD_COUNT * 8)]
+        )
+
+    @patch("visitor_admin.mongodb_connection_manager.MongoClient")
+    def test_run_concurrently_shares_one_client(self, mock_mongo_client):
+        mock_client_instance = MagicMock()
+        mock_mongo_client.return_value = mock_client_instance
+
+        def operation(visitors, number):
+            time.sleep(OPERATION_LATENCY)
+            return number
+
+        operations = [(operation, number) for number in range(THREAD_COUNT * 4)]
+        results = run_concurrently(operations, max_workers=THREAD_COUNT)
+
+        self.assertEqual(results, list(range(THREAD_COUNT * 4)))
+        mock_mongo_client.assert_called_once()
+        mock_client_instance.close.assert_called_once()
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_lookups_under_threads(self, mock_connection_manager):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        details = run_concurrently(
+            [(get_visitor_details, visitor_id) for visitor_id in self.visitor_ids],
+            max_workers=THREAD_COUNT,
+        )
+        details_many = self.run_in_threads(
+            lambda visitor_id: visitor_details_many([visitor_id])[0],
+            self.visitor_ids,
+        )
+
+        self.assertEqual(details, self.visitors_list)
+        self.assertEqual(details_many, self.visitors_list)
+
+    @patch("visitor_admin.visitor_index.query_cache", QueryCache(max_bytes=1 << 20))
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_query_cache_under_threads(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+
+        def read_or_write(number):
+            if number % 8 == 0:
+                return create_visitor(
+                    f"New Visitor {number}",
+                    30,
+                    "2021-07-02",
+                    "10:00",
+                    "Jane Doe",
+                    "First visit",
+                )
+            return len(list_visitors())
+
+        results = self.run_in_threads(read_or_write, range(THREAD_COUNT * 8))
+
+        for number, result in enumerate(results):
+            if number % 8:
+                self.assertGreaterEqual(result, len(self.visitors_list))
+        self.assertEqual(len(list_visitors()), mock_visitors.count_documents({}))
+
+    def test_query_cache_bounds_under_threads(self):
+        query_cache = QueryCache(max_bytes=4096)
+
+        def read_or_bump(number):
+            if number % 16 == 0:
+                query_cache.bump_generation()
+                return None
+            return query_cache.get_or_compute(
+                "list_visitors", {"page": number % 10}, lambda: [number % 10] * 50
+            )
+
+        results = self.run_in_threads(read_or_bump, range(THREAD_COUNT * 16))
+
+        for number, result in enumerate(results):
+            if number % 16:
+                self.assertEqual(result, [number % 10] * 50)
+        self.assertLessEqual(query_cache.size, query_cache.max_bytes)
+        self.assertEqual(
+            query_cache.size, sum(len(data) for data in query_cache.entries.values())
+        )
+
+    @patch("visitor_admin.mongodb_connection_manager.MongoClient")
+    def test_throughput_scaling(self, mock_mongo_client):
+        def operation(visitors):
+            time.sleep(OPERATION_LATENCY)
+
+        operations = [(operation,)] * (THREAD_COUNT * 4)
+        throughput = {}
+
+        for max_workers in (1, 8, THREAD_COUNT):
+            start = time.perf_counter()
+            run_concurrently(operations, max_workers=max_workers)
+            throughput[max_workers] = len(operations) / (time.perf_counter() - start)
+
+        print(
+            "run_concurrently throughput (operations/s): "
+            + ", ".join(
+                f"{workers} threads: {rate:.0f}" for workers, rate in throughput.items()
+            )
+        )
+        self.assertGreater(throughput[THREAD_COUNT], throughput[1] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
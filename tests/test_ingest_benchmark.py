@@ -0,0 +1,48 @@
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from visitor_admin.visitor_index import create_visitors
+
+VISITOR_COUNT = 5000
+
+
+class TestIngestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.visitors_data = [
+            {
+                "visitor_name": f"Visitor {number}",
+                "visitor_age": 20 + number % 60,
+                "visit_date": f"2021-07-{number % 28 + 1:02d}",
+                "visit_time": f"{number % 24:02d}:{number % 60:02d}",
+                "assistant_name": "Jane Doe",
+                "comments": "First visit",
+            }
+            for number in range(VISITOR_COUNT)
+        ]
+
+    def measure_ingest(self, validate):
+        start = time.perf_counter()
+        create_visitors(self.visitors_data, validate=validate)
+        return VISITOR_COUNT / (time.perf_counter() - start)
+
+    # The server is mocked, so this only measures the time create_visitors
+    # spends validating in Python, not the cost of the server-side validator.
+    @patch("visitor_admin.visitor_index.execute_write_using_visitors")
+    def test_client_side_validation_cost(self, mock_execute_write_using_visitors):
+        mock_execute_write_using_visitors.return_value = MagicMock(
+            upserted_count=VISITOR_COUNT, matched_count=0
+        )
+
+        validated = max(self.measure_ingest(validate=True) for _ in range(3))
+        trusted = max(self.measure_ingest(validate=False) for _ in range(3))
+
+        print(
+            f"create_visitors with a mocked server (visitors/s): "
+            f"validated in Python: {validated:.0f}, trusted: {trusted:.0f}"
+        )
+        self.assertGreater(trusted, validated)
+
+
+if __name__ == "__main__":
+    unittest.main()
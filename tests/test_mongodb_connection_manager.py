@@ -1,7 +1,14 @@
 import os
 import unittest
 from unittest.mock import patch, MagicMock
-from visitor_admin.mongodb_connection_manager import MongoDBConnectionManager
+from pymongo import ReadPreference
+from visitor_admin.mongodb_connection_manager import (
+    MongoDBConnectionManager,
+    OPERATION_PROFILES,
+    get_operation_profile,
+    is_ordered,
+    reads_from_secondaries,
+)
 
 
 class TestMongoDBConnectionManager(unittest.TestCase):
@@ -20,6 +27,7 @@ class TestMongoDBConnectionManager(unittest.TestCase):
             )
             mock_client_instance.close.assert_not_called()
         mock_client_instance.close.assert_called_once()
+        mock_client_instance.admin.command.assert_not_called()
 
     @patch("visitor_admin.mongodb_connection_manager.MongoClient")
     @patch.dict(os.environ, {}, clear=True)
@@ -35,6 +43,50 @@ class TestMongoDBConnectionManager(unittest.TestCase):
             mock_client_instance.close.assert_not_called()
         mock_client_instance.close.assert_called_once()
 
+    @patch("visitor_admin.mongodb_connection_manager.MongoClient")
+    def test_get_connection_with_profile(self, mock_mongo_client):
+        mock_client_instance = MagicMock()
+        mock_visitors = mock_client_instance["CompanyName"]["Visitor"]
+        mock_mongo_client.return_value = mock_client_instance
+
+        with MongoDBConnectionManager(profile="analytics") as visitors:
+            self.assertEqual(visitors, mock_visitors.with_options.return_value)
+            mock_visitors.with_options.assert_called_once_with(
+                **OPERATION_PROFILES["analytics"]["options"]
+            )
+        mock_client_instance.close.assert_called_once()
+
+    def test_operation_profiles(self):
+        fast_ingest = get_operation_profile("fast_ingest")["options"]
+        self.assertEqual(fast_ingest["write_concern"].document, {"w": 1, "j": False})
+
+        durable = get_operation_profile("durable")["options"]
+        self.assertEqual(
+            durable["write_concern"].document, {"w": "majority", "j": True}
+        )
+
+        analytics = get_operation_profile("analytics")["options"]
+        self.assertEqual(
+            analytics["read_preference"], ReadPreference.SECONDARY_PREFERRED
+        )
+
+        self.assertTrue(is_ordered(None))
+        self.assertTrue(is_ordered("durable"))
+        self.assertFalse(is_ordered("fast_ingest"))
+
+        self.assertFalse(reads_from_secondaries(None))
+        self.assertFalse(reads_from_secondaries("durable"))
+        self.assertTrue(reads_from_secondaries("analytics"))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError) as context:
+            MongoDBConnectionManager(profile="fastest")
+        self.assertEqual(
+            str(context.exception),
+            "Unknown operation profile: fastest, "
+            "profile should be one of: fast_ingest, durable, analytics",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
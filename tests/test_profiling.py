@@ -0,0 +1,330 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import mongomock
+from bson import ObjectId
+from pymongo import ReadPreference
+from pymongo.errors import OperationFailure
+from visitor_admin import profiling
+from visitor_admin.profiling import Profiler, explain_query
+from visitor_admin.visitor_index import (
+    execute_using_visitors,
+    get_visitor_details,
+    list_visitors,
+    run_concurrently,
+    visitor_details_many,
+    visitor_stats,
+    create_visitor,
+)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.visitors_list = [
+            {
+                "_id": ObjectId(),
+                "visitor_name": "John Doe",
+                "visitor_age": 25,
+                "visit_date": "2021-07-01",
+                "visit_time": "10:00",
+                "assistant_name": "Jane Doe",
+                "comments": "First visit",
+            },
+            {
+                "_id": ObjectId(),
+                "visitor_name": "Lady Jane",
+                "visitor_age": 30,
+                "visit_date": "2021-07-02",
+                "visit_time": "11:00",
+                "assistant_name": "John Doe",
+                "comments": "Fifth visit",
+            },
+        ]
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.directory.name, "slow_ops.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def setup_mock_visitors(self, mock_connection_manager):
+        mock_visitors = mongomock.MongoClient()["CompanyName"]["Visitor"]
+        mock_connection_manager.return_value.__enter__.return_value = mock_visitors
+        mock_visitors.insert_many(self.visitors_list)
+        return mock_visitors
+
+    def read_log(self):
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, encoding="utf-8") as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def patch_profiler(self, **kwargs):
+        return patch.object(
+            profiling, "profiler", Profiler(log_path=self.log_path, **kwargs)
+        )
+
+    @patch.dict(
+        os.environ,
+        {
+            "VISITOR_ADMIN_PROFILE_LOG": "slow_ops.jsonl",
+            "VISITOR_ADMIN_PROFILE_SAMPLE_RATE": "0.25",
+            "VISITOR_ADMIN_SLOW_OP_MS": "50",
+        },
+        clear=True,
+    )
+    def test_from_env(self):
+        profiler = Profiler.from_env()
+
+        self.assertTrue(profiler.enabled)
+        self.assertEqual(profiler.log_path, "slow_ops.jsonl")
+        self.assertEqual(profiler.sample_rate, 0.25)
+        self.assertEqual(profiler.slow_op_ms, 50.0)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_disabled_by_default(self):
+        with patch.object(profiling, "profiler", Profiler.from_env()):
+            with profiling.operation("list_visitors") as record:
+                with profiling.phase("validate"):
+                    pass
+
+        self.assertIsNone(record)
+        self.assertEqual(self.read_log(), [])
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_list_visitors_is_logged(self, mock_connection_manager, mock_explain):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        with self.patch_profiler(slow_op_ms=0):
+            self.assertEqual(list_visitors(), self.visitors_list)
+
+        [record] = self.read_log()
+        self.assertEqual(record["operation"], "list_visitors")
+        self.assertEqual(set(record["phases_ms"]), {"execute", "decode"})
+        self.assertEqual(record["queries"], [{"filter": {}}])
+        self.assertGreaterEqual(record["duration_ms"], 0)
+        self.assertIn("timestamp", record)
+        mock_explain.assert_called_once()
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_validate_phase_and_error_are_logged(
+        self, mock_connection_manager, mock_explain
+    ):
+        self.setup_mock_visitors(mock_connection_manager)
+        missing_id = "60e4f5c7c2e6e6a4b3e0e4f5"
+
+        with self.patch_profiler(slow_op_ms=0):
+            with self.assertRaises(ValueError):
+                visitor_details_many([str(self.visitors_list[0]["_id"]), missing_id])
+
+        [record] = self.read_log()
+        self.assertEqual(record["operation"], "visitor_details_many")
+        self.assertEqual(record["error"], "ValueError")
+        self.assertIn("validate", record["phases_ms"])
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_fast_operations_are_not_logged(self, mock_connection_manager):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        with self.patch_profiler(slow_op_ms=60000):
+            list_visitors()
+            create_visitor(
+                "Johnny Boy", 15, "2019-07-01", "09:00", "Jane Lana", "First visit"
+            )
+
+        self.assertEqual(self.read_log(), [])
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_unsampled_operations_are_not_logged(self, mock_connection_manager):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        with self.patch_profiler(slow_op_ms=0, sample_rate=0):
+            list_visitors()
+
+        self.assertEqual(self.read_log(), [])
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_run_concurrently_logs_each_operation(
+        self, mock_connection_manager, mock_explain
+    ):
+        self.setup_mock_visitors(mock_connection_manager)
+        operations = [
+            (get_visitor_details, str(visitor["_id"])) for visitor in self.visitors_list
+        ]
+
+        with self.patch_profiler(slow_op_ms=0):
+            run_concurrently(operations, max_workers=2, write=False)
+
+        records = self.read_log()
+        self.assertEqual(
+            [record["operation"] for record in records],
+            ["get_visitor_details", "get_visitor_details"],
+        )
+        self.assertEqual(
+            sorted(record["queries"][0]["filter"]["_id"] for record in records),
+            sorted(str(visitor["_id"]) for visitor in self.visitors_list),
+        )
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_visitor_stats_queries_are_logged(
+        self, mock_connection_manager, mock_explain
+    ):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        with self.patch_profiler(slow_op_ms=0):
+            visitor_stats()
+
+        [record] = self.read_log()
+        self.assertEqual(record["operation"], "visitor_stats")
+        self.assertEqual(
+            [query["pipeline"][0] for query in record["queries"]],
+            [
+                {"$group": {"_id": "$visit_date", "visits": {"$sum": 1}}},
+                {"$match": {}},
+            ],
+        )
+        self.assertEqual(mock_explain.call_count, 2)
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_explain_time_is_not_counted_as_duration(
+        self, mock_connection_manager, mock_explain
+    ):
+        self.setup_mock_visitors(mock_connection_manager)
+        mock_explain.side_effect = lambda visitors, query: time.sleep(0.2)
+
+        with self.patch_profiler(slow_op_ms=0):
+            list_visitors()
+
+        [record] = self.read_log()
+        self.assertGreaterEqual(record["explain_ms"], 200)
+        self.assertLess(record["duration_ms"], 200)
+
+    @patch("visitor_admin.profiling.explain_query")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_unwritable_log_does_not_fail_operation(
+        self, mock_connection_manager, mock_explain
+    ):
+        self.setup_mock_visitors(mock_connection_manager)
+        log_path = os.path.join(self.directory.name, "missing", "slow_ops.jsonl")
+
+        with patch.object(
+            profiling, "profiler", Profiler(log_path=log_path, slow_op_ms=0)
+        ):
+            with self.assertWarns(RuntimeWarning):
+                self.assertEqual(list_visitors(), self.visitors_list)
+
+    @patch("visitor_admin.mongodb_connection_manager.MongoClient")
+    def test_connect_phase(self, mock_mongo_client):
+        def operation(visitors):
+            return None
+
+        with self.patch_profiler(slow_op_ms=0):
+            execute_using_visitors(operation)
+
+        [record] = self.read_log()
+        self.assertEqual(record["operation"], "operation")
+        self.assertEqual(set(record["phases_ms"]), {"connect", "execute"})
+
+    @patch("visitor_admin.mongodb_connection_manager.MongoClient")
+    def test_connection_time_is_counted_as_connect(self, mock_mongo_client):
+        mock_mongo_client.return_value.admin.command.side_effect = (
+            lambda *args, **kwargs: time.sleep(0.2)
+        )
+
+        def operation(visitors):
+            return None
+
+        with self.patch_profiler(slow_op_ms=0):
+            execute_using_visitors(operation, profile="analytics")
+
+        [record] = self.read_log()
+        mock_mongo_client.return_value.admin.command.assert_called_once_with(
+            "ping", read_preference=ReadPreference.SECONDARY_PREFERRED
+        )
+        self.assertGreaterEqual(record["phases_ms"]["connect"], 200)
+        self.assertLess(record["phases_ms"]["execute"], 200)
+
+    def test_explain_query(self):
+        mock_visitors = MagicMock()
+        mock_visitors.find.return_value.explain.return_value = {
+            "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+            "executionStats": {
+                "nReturned": 2,
+                "executionTimeMillis": 150,
+                "totalKeysExamined": 0,
+                "totalDocsExamined": 50000,
+                "executionStages": {},
+            },
+        }
+        query = {"filter": {"visitor_name": "John Doe"}}
+
+        explain_query(mock_visitors, query)
+
+        mock_visitors.find.assert_called_once_with({"visitor_name": "John Doe"})
+        self.assertEqual(
+            query["explain"],
+            {
+                "winning_plan": {"stage": "COLLSCAN"},
+                "execution_stats": {
+                    "nReturned": 2,
+                    "executionTimeMillis": 150,
+                    "totalKeysExamined": 0,
+                    "totalDocsExamined": 50000,
+                },
+            },
+        )
+
+    def test_explain_pipeline(self):
+        mock_visitors = MagicMock()
+        mock_visitors.name = "Visitor"
+        mock_visitors.database.command.return_value = {
+            "stages": [
+                {
+                    "$cursor": {
+                        "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+                        "executionStats": {"nReturned": 2, "executionStages": {}},
+                    }
+                },
+                {"$group": {}},
+            ]
+        }
+        pipeline = [{"$group": {"_id": "$visit_date", "visits": {"$sum": 1}}}]
+        query = {"pipeline": pipeline}
+
+        explain_query(mock_visitors, query)
+
+        mock_visitors.database.command.assert_called_once_with(
+            "explain",
+            {"aggregate": "Visitor", "pipeline": pipeline, "cursor": {}},
+            verbosity="executionStats",
+        )
+        self.assertEqual(
+            query["explain"],
+            {
+                "winning_plan": {"stage": "COLLSCAN"},
+                "execution_stats": {"nReturned": 2},
+            },
+        )
+
+    def test_explain_query_failure(self):
+        mock_visitors = MagicMock()
+        mock_visitors.find.return_value.explain.side_effect = OperationFailure(
+            "not authorized"
+        )
+        query = {"filter": {}}
+
+        explain_query(mock_visitors, query)
+
+        self.assertEqual(query, {"filter": {}, "explain_error": "not authorized"})
+
+
+if __name__ == "__main__":
+    unittest.main()
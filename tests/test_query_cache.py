@@ -0,0 +1,159 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from visitor_admin.query_cache import QueryCache, make_cache_key
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.visitors_list = [
+            {"visitor_name": "John Doe", "visit_date": "2021-07-01"},
+            {"visitor_name": "Lady Jane", "visit_date": "2021-07-02"},
+        ]
+
+    def test_make_cache_key(self):
+        self.assertEqual(
+            make_cache_key("list_visitors", {"profile": None, "limit": 2}),
+            make_cache_key("list_visitors", {"limit": 2, "profile": None}),
+        )
+        self.assertNotEqual(
+            make_cache_key("list_visitors", {"profile": None}),
+            make_cache_key("list_visitors", {"profile": "analytics"}),
+        )
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_disabled_by_default(self):
+        query_cache = QueryCache.from_env()
+        compute = MagicMock(return_value=self.visitors_list)
+
+        query_cache.get_or_compute("list_visitors", {}, compute)
+        query_cache.get_or_compute("list_visitors", {}, compute)
+
+        self.assertFalse(query_cache.enabled)
+        self.assertEqual(compute.call_count, 2)
+
+    @patch.dict(os.environ, {"VISITOR_ADMIN_CACHE_BYTES": "1024"}, clear=True)
+    def test_from_env(self):
+        query_cache = QueryCache.from_env()
+
+        self.assertEqual(query_cache.max_bytes, 1024)
+        self.assertIsNone(query_cache.path)
+
+    def test_get_or_compute_caches_result(self):
+        query_cache = QueryCache(max_bytes=4096)
+        compute = MagicMock(return_value=pickle.loads(pickle.dumps(self.visitors_list)))
+
+        first_result = query_cache.get_or_compute("list_visitors", {}, compute)
+        first_result[0]["visitor_name"] = "Changed by caller"
+        second_result = query_cache.get_or_compute("list_visitors", {}, compute)
+
+        compute.assert_called_once_with()
+        self.assertEqual(second_result, self.visitors_list)
+
+    def test_bump_generation_invalidates(self):
+        query_cache = QueryCache(max_bytes=4096)
+        compute = MagicMock(return_value=self.visitors_list)
+
+        query_cache.get_or_compute("list_visitors", {}, compute)
+        query_cache.bump_generation()
+        query_cache.get_or_compute("list_visitors", {}, compute)
+
+        self.assertEqual(compute.call_count, 2)
+
+    def test_result_computed_during_write_is_not_served(self):
+        query_cache = QueryCache(max_bytes=4096)
+
+        def compute_while_writing():
+            query_cache.bump_generation()
+            return self.visitors_list
+
+        query_cache.get_or_compute("list_visitors", {}, compute_while_writing)
+        compute = MagicMock(return_value=[])
+
+        self.assertEqual(query_cache.get_or_compute("list_visitors", {}, compute), [])
+        compute.assert_called_once_with()
+
+    def test_lru_eviction(self):
+        entry_size = len(pickle.dumps(self.visitors_list))
+        query_cache = QueryCache(max_bytes=entry_size * 2)
+        compute = MagicMock(return_value=self.visitors_list)
+
+        query_cache.get_or_compute("list_visitors", {"page": 1}, compute)
+        query_cache.get_or_compute("list_visitors", {"page": 2}, compute)
+        query_cache.get_or_compute("list_visitors", {"page": 1}, compute)
+        query_cache.get_or_compute("list_visitors", {"page": 3}, compute)
+        self.assertEqual(compute.call_count, 3)
+        self.assertLessEqual(query_cache.size, query_cache.max_bytes)
+
+        query_cache.get_or_compute("list_visitors", {"page": 1}, compute)
+        self.assertEqual(compute.call_count, 3)
+
+        query_cache.get_or_compute("list_visitors", {"page": 2}, compute)
+        self.assertEqual(compute.call_count, 4)
+
+    def test_oversized_result_is_not_cached(self):
+        query_cache = QueryCache(max_bytes=8)
+        compute = MagicMock(return_value=self.visitors_list)
+
+        query_cache.get_or_compute("list_visitors", {}, compute)
+        query_cache.get_or_compute("list_visitors", {}, compute)
+
+        self.assertEqual(compute.call_count, 2)
+        self.assertEqual(query_cache.size, 0)
+
+    def test_file_tier_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "query_cache.sqlite3")
+            worker_cache = QueryCache(max_bytes=4096, path=path)
+            other_worker_cache = QueryCache(max_bytes=4096, path=path)
+            compute = MagicMock(return_value=self.visitors_list)
+
+            worker_cache.get_or_compute("visitor_stats", {}, compute)
+            self.assertEqual(
+                other_worker_cache.get_or_compute("visitor_stats", {}, compute),
+                self.visitors_list,
+            )
+            compute.assert_called_once_with()
+
+            worker_cache.bump_generation()
+            other_worker_cache.get_or_compute("visitor_stats", {}, compute)
+            self.assertEqual(compute.call_count, 2)
+
+    def test_unavailable_file_falls_back_to_memory(self):
+        query_cache = QueryCache(max_bytes=4096, path="/nonexistent/cache.sqlite3")
+        compute = MagicMock(return_value=self.visitors_list)
+
+        with self.assertWarns(RuntimeWarning):
+            query_cache.get_or_compute("visitor_stats", {}, compute)
+        query_cache.get_or_compute("visitor_stats", {}, compute)
+
+        compute.assert_called_once_with()
+        self.assertIsNone(query_cache.path)
+
+    def test_file_tier_errors_do_not_escape(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "query_cache.sqlite3")
+            query_cache = QueryCache(max_bytes=4096, path=path)
+            query_cache.get_or_compute("visitor_stats", {}, list)
+            compute = MagicMock(return_value=self.visitors_list)
+
+            with patch.object(
+                query_cache,
+                "execute_file_tier",
+                side_effect=sqlite3.OperationalError("database is locked"),
+            ):
+                with self.assertWarns(RuntimeWarning):
+                    query_cache.bump_generation()
+                with self.assertWarns(RuntimeWarning):
+                    result = query_cache.get_or_compute("visitor_stats", {}, compute)
+
+            self.assertEqual(result, self.visitors_list)
+            self.assertEqual(query_cache.path, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
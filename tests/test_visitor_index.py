@@ -1,7 +1,11 @@
+import re
 import unittest
 import mongomock
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from parameterized import parameterized
+from visitor_admin.query_cache import QueryCache
 from unittest.mock import patch, MagicMock
 from visitor_admin.visitor_index import (
     validate_string_input,
@@ -9,16 +13,35 @@ from visitor_admin.visitor_index import (
     validate_date_format,
     validate_time_format,
     execute_using_visitors,
+    execute_write_using_visitors,
+    run_concurrently,
     check_visitor_exists,
     validate_visitor_exists,
     create_indexes,
+    create_natural_key_index,
+    VISITOR_VALIDATOR,
+    VISIT_DATE_PATTERN,
+    VISIT_TIME_PATTERN,
+    install_visitor_validator,
+    create_visitor_collection,
     create_visitor_indexes,
     add_visitor_data,
+    upsert_visitor_data,
     create_visitor,
+    upsert_visitor,
     get_visitors,
     list_visitors,
+    stream_visitors,
+    build_visitor,
+    dedupe_visitors,
+    add_many_visitor_data,
+    create_visitors,
+    get_visitor_stats,
+    visitor_stats,
     get_visitor_details,
     visitor_details,
+    get_many_visitor_details,
+    visitor_details_many,
     delete_all_visitors,
     delete_all,
     delete_single_visitor,
@@ -189,6 +212,18 @@ class TestVisitorIndex(unittest.TestCase):
             f"Operation on {mock_visitors} with no args",
         )
 
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_execute_using_visitors_with_profile(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+
+        def some_function(mock_visitors):
+            return mock_visitors
+
+        self.assertEqual(
+            execute_using_visitors(some_function, profile="durable"), mock_visitors
+        )
+        mock_connection_manager.assert_called_once_with(profile="durable")
+
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_check_visitor_exists(self, mock_connection_manager):
         visitor_id = "60e4f5c7c2e6e6a4b3e0e4f5"
@@ -209,7 +244,7 @@ class TestVisitorIndex(unittest.TestCase):
         validate_visitor_exists(visitor_id)
 
         mock_execute_using_visitors.assert_called_once_with(
-            check_visitor_exists, visitor_id
+            check_visitor_exists, visitor_id, profile=None
         )
 
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
@@ -248,6 +283,162 @@ class TestVisitorIndex(unittest.TestCase):
         create_visitor_indexes()
         mock_execute_using_visitors.assert_called_once_with(create_indexes)
 
+    def server_pattern_matches(self, pattern, value):
+        # Python's re spells PCRE's end-of-string anchor \z as \Z.
+        return bool(re.match(pattern.replace(r"\z", r"\Z"), value))
+
+    @parameterized.expand(
+        [
+            ("2021-07-01", True, True),
+            ("2021-7-1", True, True),
+            ("2021-02-30", True, False),
+            ("2021-07-01\n", False, False),
+            ("2021-13-01", False, False),
+            ("21 March 2025", False, False),
+            ("03/02/1970", False, False),
+            ("01-01-2027", False, False),
+        ]
+    )
+    def test_visit_date_pattern_approximates_validate_date_format(
+        self, visit_date, matches_pattern, valid
+    ):
+        self.assertEqual(
+            self.server_pattern_matches(VISIT_DATE_PATTERN, visit_date),
+            matches_pattern,
+        )
+        if not valid:
+            with self.assertRaises(ValueError):
+                validate_date_format(visit_date)
+
+    @parameterized.expand(
+        [
+            ("10:00", True),
+            ("9:00", True),
+            ("23:59", True),
+            ("10:00\n", False),
+            ("24:00", False),
+            ("21H00", False),
+            ("08:19 PM", False),
+        ]
+    )
+    def test_visit_time_pattern_matches_validate_time_format(self, visit_time, valid):
+        self.assertEqual(
+            self.server_pattern_matches(VISIT_TIME_PATTERN, visit_time), valid
+        )
+        if not valid:
+            with self.assertRaises(ValueError):
+                validate_time_format(visit_time)
+
+    def test_install_visitor_validator_creates_collection(self):
+        mock_visitors = MagicMock()
+        mock_visitors.name = "Visitor"
+        mock_visitors.database.list_collection_names.return_value = []
+
+        install_visitor_validator(mock_visitors)
+
+        mock_visitors.database.create_collection.assert_called_once_with(
+            "Visitor", validator=VISITOR_VALIDATOR
+        )
+        mock_visitors.database.command.assert_not_called()
+
+    def test_install_visitor_validator_updates_existing_collection(self):
+        mock_visitors = MagicMock()
+        mock_visitors.name = "Visitor"
+        mock_visitors.database.list_collection_names.return_value = ["Visitor"]
+
+        install_visitor_validator(mock_visitors)
+
+        mock_visitors.database.command.assert_called_once_with(
+            "collMod",
+            "Visitor",
+            validator=VISITOR_VALIDATOR,
+            validationLevel="strict",
+            validationAction="error",
+        )
+        mock_visitors.database.create_collection.assert_not_called()
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_create_visitor_collection(self, mock_execute_using_visitors):
+        create_visitor_collection()
+        mock_execute_using_visitors.assert_called_once_with(install_visitor_validator)
+
+    def test_create_natural_key_index(self):
+        mock_visitors = MagicMock()
+
+        create_natural_key_index(mock_visitors)
+
+        mock_visitors.create_index.assert_called_once_with(
+            [("visitor_name", 1), ("visit_date", 1), ("visit_time", 1)],
+            unique=True,
+            name="visit_natural_key",
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_create_visitor_indexes_with_unique_visits(
+        self,
+        mock_execute_using_visitors,
+    ):
+        create_visitor_indexes(unique_visits=True)
+        mock_execute_using_visitors.assert_any_call(create_indexes)
+        mock_execute_using_visitors.assert_any_call(create_natural_key_index)
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_add_visitor_data_duplicate_visit(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        create_natural_key_index(mock_visitors)
+        duplicate_visitor = dict(self.visitors_list[0])
+        del duplicate_visitor["_id"]
+
+        with self.assertRaises(ValueError) as context:
+            add_visitor_data(mock_visitors, duplicate_visitor)
+        self.assertEqual(
+            str(context.exception),
+            "Visit: John Doe on 2021-07-01 at 10:00 already exists",
+        )
+        self.assertEqual(mock_visitors.count_documents({}), len(self.visitors_list))
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_upsert_visitor_data(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        retried_visitor = dict(self.visitors_list[0], comments="Retried visit")
+        del retried_visitor["_id"]
+
+        self.assertFalse(upsert_visitor_data(mock_visitors, retried_visitor))
+        self.assertEqual(mock_visitors.count_documents({}), len(self.visitors_list))
+        self.assertEqual(
+            mock_visitors.find_one({"_id": self.visitors_list[0]["_id"]})["comments"],
+            "Retried visit",
+        )
+
+        new_visitor = dict(retried_visitor, visit_time="15:00")
+        self.assertTrue(upsert_visitor_data(mock_visitors, new_visitor))
+        self.assertEqual(mock_visitors.count_documents({}), len(self.visitors_list) + 1)
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_upsert_visitor(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        visitor_data = (
+            "Johnny Boy",
+            15,
+            "2019-07-01",
+            "09:00",
+            "Jane Lana",
+            "First visit",
+        )
+
+        self.assertEqual(
+            upsert_visitor(*visitor_data), "Visitor has been created successfully"
+        )
+        self.assertEqual(
+            upsert_visitor(*visitor_data),
+            "Visit: Johnny Boy on 2019-07-01 at 09:00 already exists "
+            "and has been updated",
+        )
+        self.assertEqual(mock_visitors.count_documents({}), len(self.visitors_list) + 1)
+
+        with self.assertRaises(TypeError):
+            upsert_visitor("Johnny Boy", "15", "2019-07-01", "09:00", "Jane", "Hi")
+
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_add_visitor_data(self, mock_connection_manager):
         mock_visitors = self.setup_mock_visitors(mock_connection_manager)
@@ -301,7 +492,7 @@ class TestVisitorIndex(unittest.TestCase):
         )
 
         mock_execute_using_visitors.assert_called_once_with(
-            add_visitor_data, visitor_data
+            add_visitor_data, visitor_data, profile=None
         )
 
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
@@ -359,7 +550,7 @@ class TestVisitorIndex(unittest.TestCase):
         self, mock_execute_using_visitors
     ):
         list_visitors()
-        mock_execute_using_visitors.assert_called_once_with(get_visitors)
+        mock_execute_using_visitors.assert_called_once_with(get_visitors, profile=None)
 
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_list_visitors(self, mock_connection_manager):
@@ -371,6 +562,265 @@ class TestVisitorIndex(unittest.TestCase):
         self.assertIsInstance(retrieved_visitors, list)
         self.assertEqual(excepted_visitors, retrieved_visitors)
 
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_stream_visitors(self, mock_connection_manager):
+        self.setup_mock_visitors(mock_connection_manager)
+
+        streamed_visitors = stream_visitors(batch_size=2)
+
+        self.assertNotIsInstance(streamed_visitors, list)
+        self.assertEqual(self.visitors_list, list(streamed_visitors))
+
+    def test_build_visitor(self):
+        visitor_data = dict(self.visitors_list[0])
+        visitor = build_visitor(visitor_data)
+
+        del visitor_data["_id"]
+        self.assertEqual(visitor_data, visitor)
+
+        with self.assertRaises(ValueError) as context:
+            build_visitor({"visitor_name": "John Doe"})
+        self.assertEqual(
+            str(context.exception),
+            "Visitor data is missing fields: visitor_age, visit_date, visit_time, "
+            "assistant_name, comments",
+        )
+
+        unchecked_visitor = build_visitor(dict(visitor_data, visitor_age="25"), False)
+        self.assertEqual(unchecked_visitor["visitor_age"], "25")
+
+        with self.assertRaises(ValueError) as context:
+            build_visitor("John Doe")
+        self.assertEqual(
+            str(context.exception), "Visitor data: 'John Doe' must be a dictionary"
+        )
+
+    def test_add_many_visitor_data(self):
+        mock_visitors = MagicMock()
+        new_visitors = [
+            {
+                "visitor_name": "Johnny Boy",
+                "visit_date": "2019-07-01",
+                "visit_time": "09:00",
+                "comments": "First visit",
+            },
+        ]
+
+        result = add_many_visitor_data(mock_visitors, new_visitors, ordered=False)
+
+        mock_visitors.bulk_write.assert_called_once_with(
+            [
+                UpdateOne(
+                    {
+                        "visitor_name": "Johnny Boy",
+                        "visit_date": "2019-07-01",
+                        "visit_time": "09:00",
+                    },
+                    {"$set": new_visitors[0]},
+                    upsert=True,
+                )
+            ],
+            ordered=False,
+        )
+        self.assertEqual(result, mock_visitors.bulk_write.return_value)
+
+    def test_add_many_visitor_data_rejected_by_server(self):
+        mock_visitors = MagicMock()
+        mock_visitors.bulk_write.side_effect = BulkWriteError(
+            {
+                "writeErrors": [
+                    {"index": 0, "code": 121, "errmsg": "Document failed validation"}
+                ]
+            }
+        )
+
+        with self.assertRaises(ValueError) as context:
+            add_many_visitor_data(mock_visitors, [dict(self.visitors_list[0])])
+        self.assertEqual(
+            str(context.exception),
+            "1 visitors were rejected by the server: Document failed validation. "
+            "0 visitors were created, 0 already existed",
+        )
+
+    def test_add_many_visitor_data_ordered_batch_stops_early(self):
+        mock_visitors = MagicMock()
+        mock_visitors.bulk_write.side_effect = BulkWriteError(
+            {
+                "writeErrors": [
+                    {"index": 1, "code": 121, "errmsg": "Document failed validation"}
+                ],
+                "nUpserted": 1,
+                "nMatched": 0,
+            }
+        )
+
+        with self.assertRaises(ValueError) as context:
+            add_many_visitor_data(
+                mock_visitors, [dict(visitor) for visitor in self.visitors_list]
+            )
+        self.assertEqual(
+            str(context.exception),
+            "1 visitors were rejected by the server: Document failed validation. "
+            "1 visitors were created, 0 already existed. "
+            f"The batch stopped at visitor 1, so {len(self.visitors_list) - 2} "
+            "later visitors were not attempted",
+        )
+
+    def test_add_many_visitor_data_write_concern_error(self):
+        mock_visitors = MagicMock()
+        mock_visitors.bulk_write.side_effect = BulkWriteError(
+            {
+                "writeErrors": [],
+                "writeConcernErrors": [
+                    {"code": 64, "errmsg": "waiting for replication timed out"}
+                ],
+            }
+        )
+
+        with self.assertRaises(ValueError) as context:
+            add_many_visitor_data(mock_visitors, [dict(self.visitors_list[0])])
+        self.assertEqual(
+            str(context.exception),
+            "The server could not confirm the visitors were written: "
+            "waiting for replication timed out",
+        )
+
+    def test_dedupe_visitors(self):
+        retried_visitor = dict(self.visitors_list[0], comments="Retried visit")
+
+        unique_visitors = dedupe_visitors(self.visitors_list + [retried_visitor])
+
+        self.assertEqual(len(unique_visitors), len(self.visitors_list))
+        self.assertIn(retried_visitor, unique_visitors)
+        self.assertNotIn(self.visitors_list[0], unique_visitors)
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_create_visitors(self, mock_execute_using_visitors):
+        mock_execute_using_visitors.return_value = MagicMock(
+            upserted_count=1, matched_count=4
+        )
+        visitors_data = [
+            {key: value for key, value in visitor.items() if key != "_id"}
+            for visitor in self.visitors_list
+        ]
+
+        created_visitors_confirmed = create_visitors(visitors_data + visitors_data)
+
+        mock_execute_using_visitors.assert_called_once_with(
+            add_many_visitor_data, visitors_data, True, profile=None
+        )
+        self.assertEqual(
+            created_visitors_confirmed,
+            "1 visitors have been created successfully, 4 already existed",
+        )
+        self.assertEqual(create_visitors([]), "No visitors were created")
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_create_visitors_with_fast_ingest_profile(
+        self, mock_execute_using_visitors
+    ):
+        visitors_data = [
+            {key: value for key, value in visitor.items() if key != "_id"}
+            for visitor in self.visitors_list
+        ]
+
+        create_visitors(visitors_data, profile="fast_ingest")
+
+        mock_execute_using_visitors.assert_called_once_with(
+            add_many_visitor_data, visitors_data, False, profile="fast_ingest"
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_create_visitors_validates_before_writing(
+        self, mock_execute_using_visitors
+    ):
+        visitors_data = [
+            {key: value for key, value in visitor.items() if key != "_id"}
+            for visitor in self.visitors_list
+        ]
+        visitors_data[1]["visitor_age"] = "30"
+
+        with self.assertRaises(TypeError):
+            create_visitors(visitors_data)
+        mock_execute_using_visitors.assert_not_called()
+
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_get_visitor_stats(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        mock_visitors.insert_one(dict(self.visitors_list[0], _id=ObjectId()))
+
+        self.assertEqual(
+            get_visitor_stats(mock_visitors),
+            {
+                "total_visitors": 5,
+                "visits_per_day": {
+                    "2021-07-01": 2,
+                    "2021-07-02": 1,
+                    "2021-07-03": 1,
+                    "2021-07-04": 1,
+                },
+            },
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_visitor_stats_triggers_execute_using_visitors(
+        self, mock_execute_using_visitors
+    ):
+        visitor_stats()
+        mock_execute_using_visitors.assert_called_once_with(
+            get_visitor_stats, profile=None
+        )
+
+    @patch("visitor_admin.visitor_index.query_cache", QueryCache(max_bytes=65536))
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_list_visitors_is_cached_until_a_write(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+
+        self.assertEqual(list_visitors(), self.visitors_list)
+        mock_visitors.delete_many({})
+        self.assertEqual(list_visitors(), self.visitors_list)
+
+        create_visitor(
+            "Johnny Boy", 15, "2019-07-01", "09:00", "Jane Lana", "First visit"
+        )
+        self.assertEqual(len(list_visitors()), 1)
+
+    @patch("visitor_admin.visitor_index.query_cache", QueryCache(max_bytes=65536))
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_visitor_stats_is_cached_per_profile(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+
+        self.assertEqual(visitor_stats()["total_visitors"], 4)
+        mock_visitors.delete_many({})
+        self.assertEqual(visitor_stats()["total_visitors"], 4)
+        self.assertEqual(visitor_stats(profile="durable")["total_visitors"], 0)
+
+    @patch("visitor_admin.visitor_index.query_cache", QueryCache(max_bytes=65536))
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_secondary_reads_are_not_cached(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+
+        self.assertEqual(list_visitors(profile="analytics"), self.visitors_list)
+        self.assertEqual(visitor_stats(profile="analytics")["total_visitors"], 4)
+        mock_visitors.delete_many({})
+        self.assertEqual(list_visitors(profile="analytics"), [])
+        self.assertEqual(visitor_stats(profile="analytics")["total_visitors"], 0)
+
+    @patch("visitor_admin.visitor_index.query_cache")
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_execute_write_using_visitors_bumps_generation(
+        self, mock_execute_using_visitors, mock_query_cache
+    ):
+        mock_execute_using_visitors.side_effect = ValueError("Write failed")
+
+        with self.assertRaises(ValueError):
+            execute_write_using_visitors(delete_all_visitors, profile="durable")
+
+        mock_execute_using_visitors.assert_called_once_with(
+            delete_all_visitors, profile="durable"
+        )
+        mock_query_cache.bump_generation.assert_called_once_with()
+
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_get_visitor_details(self, mock_connection_manager):
         mock_visitors = self.setup_mock_visitors(mock_connection_manager)
@@ -381,6 +831,32 @@ class TestVisitorIndex(unittest.TestCase):
         self.assertIsInstance(details_of_visitor, dict)
         self.assertEqual(self.visitors_list[2], details_of_visitor)
 
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_get_visitor_details_missing_visitor(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        visitor_id = "60e4f5c7c2e6e6a4b3e0e4f5"
+
+        with self.assertRaises(ValueError) as context:
+            get_visitor_details(mock_visitors, visitor_id)
+        self.assertEqual(
+            str(context.exception),
+            f"Visitor: {visitor_id} does not exist, please enter an existing visitor ID",
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_visitor_details_checks_existence_with_profile(
+        self, mock_execute_using_visitors
+    ):
+        visitor_id = str(self.visitors_list[2]["_id"])
+        visitor_details(visitor_id, profile="analytics")
+
+        mock_execute_using_visitors.assert_any_call(
+            check_visitor_exists, visitor_id, profile="analytics"
+        )
+        mock_execute_using_visitors.assert_called_with(
+            get_visitor_details, visitor_id, profile="analytics"
+        )
+
     @patch("visitor_admin.visitor_index.execute_using_visitors")
     def test_visitor_details_triggers_execute_using_visitors(
         self, mock_execute_using_visitors
@@ -388,7 +864,9 @@ class TestVisitorIndex(unittest.TestCase):
         visitor_id = str(self.visitors_list[2]["_id"])
         visitor_details(visitor_id)
 
-        mock_execute_using_visitors.assert_called_with(get_visitor_details, visitor_id)
+        mock_execute_using_visitors.assert_called_with(
+            get_visitor_details, visitor_id, profile=None
+        )
 
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_visitor_details(self, mock_connection_manager):
@@ -399,6 +877,76 @@ class TestVisitorIndex(unittest.TestCase):
         self.assertIsInstance(details_of_visitor, dict)
         self.assertEqual(self.visitors_list[2], details_of_visitor)
 
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_get_many_visitor_details(self, mock_connection_manager):
+        mock_visitors = self.setup_mock_visitors(mock_connection_manager)
+        visitor_ids = [
+            str(self.visitors_list[3]["_id"]),
+            str(self.visitors_list[1]["_id"]),
+        ]
+
+        details_of_visitors = get_many_visitor_details(mock_visitors, visitor_ids)
+
+        self.assertEqual(
+            [self.visitors_list[3], self.visitors_list[1]], details_of_visitors
+        )
+
+        missing_id = "60e4f5c7c2e6e6a4b3e0e4f5"
+        with self.assertRaises(ValueError) as context:
+            get_many_visitor_details(mock_visitors, visitor_ids + [missing_id])
+        self.assertEqual(
+            str(context.exception),
+            f"Visitors: {missing_id} do not exist, please enter existing visitor IDs",
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_visitor_details_many_triggers_execute_using_visitors(
+        self, mock_execute_using_visitors
+    ):
+        visitor_ids = [str(visitor["_id"]) for visitor in self.visitors_list]
+
+        visitor_details_many(visitor_ids)
+
+        mock_execute_using_visitors.assert_called_once_with(
+            get_many_visitor_details, visitor_ids, profile=None
+        )
+
+    @patch("visitor_admin.visitor_index.execute_using_visitors")
+    def test_visitor_details_many_validation(self, mock_execute_using_visitors):
+        self.assertEqual(visitor_details_many([]), [])
+
+        with self.assertRaises(ValueError) as context:
+            visitor_details_many("60e4f5c7c2e6e6a4b3e0e4f5")
+        self.assertEqual(
+            str(context.exception),
+            "Visitor IDs: '60e4f5c7c2e6e6a4b3e0e4f5' must be a list",
+        )
+
+        with self.assertRaises(TypeError):
+            visitor_details_many(["60e4f5c7c2e6e6a4b3e0e4f5", 1])
+        mock_execute_using_visitors.assert_not_called()
+
+    @patch("visitor_admin.visitor_index.query_cache")
+    @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
+    def test_run_concurrently(self, mock_connection_manager, mock_query_cache):
+        self.setup_mock_visitors(mock_connection_manager)
+        operations = [
+            (get_visitor_details, str(visitor["_id"])) for visitor in self.visitors_list
+        ]
+        operations.append((get_visitors,))
+
+        results = run_concurrently(
+            operations, max_workers=4, profile="analytics", write=False
+        )
+
+        mock_connection_manager.assert_called_once_with(profile="analytics")
+        self.assertEqual(results[:-1], self.visitors_list)
+        self.assertEqual(results[-1], self.visitors_list)
+        mock_query_cache.bump_generation.assert_not_called()
+
+        run_concurrently([(delete_all_visitors,)])
+        mock_query_cache.bump_generation.assert_called_once_with()
+
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
     def test_delete_all_visitors(self, mock_connection_manager):
         mock_visitors = self.setup_mock_visitors(mock_connection_manager)
@@ -417,7 +965,9 @@ class TestVisitorIndex(unittest.TestCase):
         mock_input.assert_called_once_with(
             "Are you sure you want to delete all visitors? (yes/no): "
         )
-        mock_execute_using_visitors.assert_called_once_with(delete_all_visitors)
+        mock_execute_using_visitors.assert_called_once_with(
+            delete_all_visitors, profile=None
+        )
 
     @patch("builtins.input", return_value="yes")
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
@@ -470,7 +1020,7 @@ class TestVisitorIndex(unittest.TestCase):
             f"Are you sure you want to delete this visitor: {visitor_id}? (yes/no): "
         )
         mock_execute_using_visitors.assert_called_with(
-            delete_single_visitor, visitor_id
+            delete_single_visitor, visitor_id, profile=None
         )
 
     @patch("builtins.input", return_value="yes")
@@ -539,7 +1089,7 @@ class TestVisitorIndex(unittest.TestCase):
         update_visitor(visitor_id, new_info)
 
         mock_execute_using_visitors.assert_called_with(
-            update_single_visitor, search_criteria, info_update
+            update_single_visitor, search_criteria, info_update, profile=None
         )
 
     @patch("visitor_admin.visitor_index.MongoDBConnectionManager")
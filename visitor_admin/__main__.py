@@ -0,0 +1,4 @@
+import sys
+from visitor_admin.cli import main
+
+sys.exit(main())
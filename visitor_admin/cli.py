@@ -0,0 +1,247 @@
+import argparse
+import json
+import sys
+
+# visitor_index pulls in pymongo and bson, so it is only imported by the
+# command handlers that need it. This keeps `visitor-admin --help` fast.
+
+
+def to_json(document):
+    return json.dumps(document, default=str)
+
+
+def read_visitors_data(input_file):
+    for line in input_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def run_indexes(args):
+    from visitor_admin import visitor_index
+
+    visitor_index.create_visitor_indexes(args.unique_visits)
+    print("Visitor indexes have been created")
+
+
+def run_collection(args):
+    from visitor_admin import visitor_index
+
+    visitor_index.create_visitor_collection()
+    print("Visitor collection validator has been installed")
+
+
+def run_create(args):
+    from visitor_admin import visitor_index
+
+    create = (
+        visitor_index.upsert_visitor if args.upsert else visitor_index.create_visitor
+    )
+    print(
+        create(
+            args.visitor_name,
+            args.visitor_age,
+            args.visit_date,
+            args.visit_time,
+            args.assistant_name,
+            args.comments,
+            profile=args.profile,
+        )
+    )
+
+
+def run_list(args):
+    from visitor_admin import visitor_index
+
+    for visitor in visitor_index.stream_visitors(args.batch_size, args.profile):
+        print(to_json(visitor))
+
+
+def run_details(args):
+    from visitor_admin import visitor_index
+
+    if len(args.visitor_ids) == 1:
+        print(to_json(visitor_index.visitor_details(args.visitor_ids[0], args.profile)))
+        return
+
+    for visitor in visitor_index.visitor_details_many(args.visitor_ids, args.profile):
+        print(to_json(visitor))
+
+
+def run_update(args):
+    from visitor_admin import visitor_index
+
+    new_info = {
+        field_name: getattr(args, field_name)
+        for field_name in visitor_index.VISITOR_FIELDS
+        if getattr(args, field_name) is not None
+    }
+    if not new_info:
+        raise ValueError("At least one field to update must be given")
+
+    print(visitor_index.update_visitor(args.visitor_id, new_info, args.profile))
+
+
+def run_delete(args):
+    from visitor_admin import visitor_index
+
+    if args.all:
+        print(visitor_index.delete_all(args.profile))
+    else:
+        print(visitor_index.delete_visitor(args.visitor_id, args.profile))
+
+
+def run_import(args):
+    from visitor_admin import visitor_index
+
+    if args.path == "-":
+        visitors_data = list(read_visitors_data(sys.stdin))
+    else:
+        with open(args.path, encoding="utf-8") as input_file:
+            visitors_data = list(read_visitors_data(input_file))
+
+    print(
+        visitor_index.create_visitors(
+            visitors_data, args.profile, validate=not args.trusted
+        )
+    )
+
+
+def run_export(args):
+    from visitor_admin import visitor_index
+
+    if args.path == "-":
+        for visitor in visitor_index.stream_visitors(args.batch_size, args.profile):
+            sys.stdout.write(to_json(visitor) + "\n")
+        return
+
+    with open(args.path, "w", encoding="utf-8") as output_file:
+        for visitor in visitor_index.stream_visitors(args.batch_size, args.profile):
+            output_file.write(to_json(visitor) + "\n")
+
+
+def run_stats(args):
+    from visitor_admin import visitor_index
+
+    print(to_json(visitor_index.visitor_stats(args.profile)))
+
+
+def add_visitor_arguments(parser, required):
+    parser.add_argument("--visitor-name", dest="visitor_name", required=required)
+    parser.add_argument(
+        "--visitor-age", dest="visitor_age", type=int, required=required
+    )
+    parser.add_argument(
+        "--visit-date", dest="visit_date", required=required, help="YYYY-MM-DD"
+    )
+    parser.add_argument(
+        "--visit-time", dest="visit_time", required=required, help="HH:MM"
+    )
+    parser.add_argument("--assistant-name", dest="assistant_name", required=required)
+    parser.add_argument("--comments", dest="comments", required=required)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="visitor-admin", description="Manage visitors stored in MongoDB."
+    )
+    parser.add_argument(
+        "--profile",
+        help="operation profile: fast_ingest, durable or analytics",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes_parser = subparsers.add_parser("indexes", help="create the visitor indexes")
+    indexes_parser.add_argument(
+        "--unique-visits",
+        action="store_true",
+        help="reject a second visit with the same visitor name, date and time",
+    )
+    indexes_parser.set_defaults(handler=run_indexes)
+
+    collection_parser = subparsers.add_parser(
+        "collection", help="install the server-side visitor schema validator"
+    )
+    collection_parser.set_defaults(handler=run_collection)
+
+    create_parser = subparsers.add_parser("create", help="create a visitor")
+    add_visitor_arguments(create_parser, required=True)
+    create_parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="update the visit instead of failing when it already exists",
+    )
+    create_parser.set_defaults(handler=run_create)
+
+    list_parser = subparsers.add_parser(
+        "list", help="stream all visitors as JSON lines"
+    )
+    list_parser.add_argument("--batch-size", type=int, default=100)
+    list_parser.set_defaults(handler=run_list)
+
+    details_parser = subparsers.add_parser("details", help="show visitors by ID")
+    details_parser.add_argument("visitor_ids", nargs="+", metavar="visitor_id")
+    details_parser.set_defaults(handler=run_details)
+
+    update_parser = subparsers.add_parser("update", help="update a visitor")
+    update_parser.add_argument("visitor_id")
+    add_visitor_arguments(update_parser, required=False)
+    update_parser.set_defaults(handler=run_update)
+
+    delete_parser = subparsers.add_parser("delete", help="delete visitors")
+    delete_target = delete_parser.add_mutually_exclusive_group(required=True)
+    delete_target.add_argument("visitor_id", nargs="?")
+    delete_target.add_argument("--all", action="store_true")
+    delete_parser.set_defaults(handler=run_delete)
+
+    import_parser = subparsers.add_parser(
+        "import", help="create visitors from a JSON lines file"
+    )
+    import_parser.add_argument("path", help="JSON lines file, or - for stdin")
+    import_parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="skip client-side checks and rely on the server-side validator",
+    )
+    import_parser.set_defaults(handler=run_import)
+
+    export_parser = subparsers.add_parser(
+        "export", help="write all visitors to a JSON lines file"
+    )
+    export_parser.add_argument(
+        "path", nargs="?", default="-", help="JSON lines file, or - for stdout"
+    )
+    export_parser.add_argument("--batch-size", type=int, default=100)
+    export_parser.set_defaults(handler=run_export)
+
+    stats_parser = subparsers.add_parser("stats", help="show visitor counts")
+    stats_parser.set_defaults(handler=run_stats)
+
+    return parser
+
+
+def is_user_facing_error(error):
+    if isinstance(error, (TypeError, ValueError, OSError)):
+        return True
+
+    # Only reached once a command has failed, so --help never loads these.
+    from bson.errors import BSONError
+    from pymongo.errors import PyMongoError
+
+    return isinstance(error, (BSONError, PyMongoError))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        args.handler(args)
+    except Exception as error:
+        if not is_user_facing_error(error):
+            raise
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,4 +8,5 @@ from visitor_admin.visitor_index import (
     delete_all,
 )
 
-create_visitor_indexes()
+if __name__ == "__main__":
+    create_visitor_indexes()
@@ -1,16 +1,79 @@
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, ReadPreference, WriteConcern
+from pymongo.read_concern import ReadConcern
+from visitor_admin import profiling
+
+# Mongo 4.4 (see compose.yml) only allows "snapshot" reads inside
+# transactions, so analytics reads use "majority" for a consistent view.
+# Analytics reads may reach a lagging secondary, so they are never cached.
+OPERATION_PROFILES = {
+    "fast_ingest": {
+        "options": {"write_concern": WriteConcern(w=1, j=False)},
+        "ordered": False,
+    },
+    "durable": {
+        "options": {"write_concern": WriteConcern(w="majority", j=True)},
+        "ordered": True,
+    },
+    "analytics": {
+        "options": {
+            "read_preference": ReadPreference.SECONDARY_PREFERRED,
+            "read_concern": ReadConcern("majority"),
+        },
+        "ordered": True,
+    },
+}
+
+
+def get_operation_profile(profile):
+    if profile not in OPERATION_PROFILES:
+        raise ValueError(
+            f"Unknown operation profile: {profile}, "
+            f"profile should be one of: {', '.join(OPERATION_PROFILES)}"
+        )
+    return OPERATION_PROFILES[profile]
+
+
+def is_ordered(profile):
+    if profile is None:
+        return True
+    return get_operation_profile(profile)["ordered"]
+
+
+def reads_from_secondaries(profile):
+    if profile is None:
+        return False
+    read_preference = get_operation_profile(profile)["options"].get(
+        "read_preference", ReadPreference.PRIMARY
+    )
+    return read_preference != ReadPreference.PRIMARY
 
 
 class MongoDBConnectionManager:
-    def __init__(self, default_uri="mongodb://localhost:27017"):
+    def __init__(self, default_uri="mongodb://localhost:27017", profile=None):
         self.uri = os.getenv("MONGODB_URI", default_uri)
+        self.options = {}
+        if profile is not None:
+            self.options = get_operation_profile(profile)["options"]
 
     def __enter__(self):
-        self.client = MongoClient(self.uri)
-        self.db = self.client["CompanyName"]
-        self.visitors = self.db["Visitor"]
+        with profiling.phase("connect"):
+            self.client = MongoClient(self.uri)
+            # MongoClient connects lazily. When profiling, connect here so
+            # server selection, the handshake and auth are timed as connect.
+            if profiling.profiler.current_record is not None:
+                self.client.admin.command(
+                    "ping",
+                    read_preference=self.options.get(
+                        "read_preference", ReadPreference.PRIMARY
+                    ),
+                )
+            self.db = self.client["CompanyName"]
+            self.visitors = self.db["Visitor"]
+            if self.options:
+                self.visitors = self.visitors.with_options(**self.options)
         return self.visitors
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.client.close()
+        with profiling.phase("connect"):
+            self.client.close()
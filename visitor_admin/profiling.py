@@ -0,0 +1,242 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pymongo.errors import PyMongoError
+
+EXECUTION_STATS_FIELDS = (
+    "nReturned",
+    "executionTimeMillis",
+    "totalKeysExamined",
+    "totalDocsExamined",
+)
+
+
+class Profiler:
+    def __init__(self, log_path=None, sample_rate=1.0, slow_op_ms=100.0):
+        self.log_path = log_path
+        self.sample_rate = sample_rate
+        self.slow_op_ms = slow_op_ms
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            log_path=os.getenv("VISITOR_ADMIN_PROFILE_LOG"),
+            sample_rate=float(os.getenv("VISITOR_ADMIN_PROFILE_SAMPLE_RATE", "1")),
+            slow_op_ms=float(os.getenv("VISITOR_ADMIN_SLOW_OP_MS", "100")),
+        )
+
+    @property
+    def enabled(self):
+        return self.log_path is not None
+
+    @property
+    def current_record(self):
+        return getattr(self.local, "record", None) or None
+
+    def write(self, record):
+        # A log that cannot be written must not fail the operation it describes.
+        line = json.dumps(record, default=str) + "\n"
+        try:
+            with self.lock:
+                with open(self.log_path, "a", encoding="utf-8") as log_file:
+                    log_file.write(line)
+        except OSError as error:
+            warnings.warn(
+                f"Profile log {self.log_path} failed: {error}", RuntimeWarning
+            )
+
+
+profiler = Profiler.from_env()
+
+
+def add_phase(record, phase_name, elapsed_ms):
+    record["phases_ms"][phase_name] = (
+        record["phases_ms"].get(phase_name, 0.0) + elapsed_ms
+    )
+
+
+@contextmanager
+def operation(operation_name):
+    # Nested calls (a public function calling execute_using_visitors) join
+    # the outer record. False marks an operation that was not sampled.
+    if not profiler.enabled or getattr(profiler.local, "record", None) is not None:
+        yield profiler.current_record
+        return
+
+    if random.random() >= profiler.sample_rate:
+        profiler.local.record = False
+        try:
+            yield None
+        finally:
+            profiler.local.record = None
+        return
+
+    record = {"operation": operation_name, "phases_ms": {}, "queries": []}
+    profiler.local.record = record
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as error:
+        record["error"] = type(error).__name__
+        raise
+    finally:
+        profiler.local.record = None
+        # Time spent explaining slow queries is logged apart from the
+        # operation, so it does not inflate duration_ms.
+        duration_ms = (time.perf_counter() - start) * 1000
+        if "explain_ms" in record:
+            duration_ms -= record["explain_ms"]
+            record["explain_ms"] = round(record["explain_ms"], 3)
+        if duration_ms >= profiler.slow_op_ms:
+            record["timestamp"] = datetime.now(timezone.utc).isoformat()
+            record["duration_ms"] = round(duration_ms, 3)
+            record["phases_ms"] = {
+                phase_name: round(elapsed_ms, 3)
+                for phase_name, elapsed_ms in record["phases_ms"].items()
+            }
+            profiler.write(record)
+
+
+@contextmanager
+def phase(phase_name):
+    record = profiler.current_record
+    if record is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(record, phase_name, (time.perf_counter() - start) * 1000)
+
+
+def profiled(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with operation(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledCursor:
+    def __init__(self, cursor, record):
+        self.cursor = cursor
+        self.record = record
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        documents = iter(self.cursor)
+        while True:
+            start = time.perf_counter()
+            try:
+                document = next(documents)
+            except StopIteration:
+                return
+            finally:
+                add_phase(self.record, "decode", (time.perf_counter() - start) * 1000)
+            yield document
+
+
+class ProfiledCollection:
+    def __init__(self, collection, record):
+        self.collection = collection
+        self.record = record
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find(self, filter=None, *args, **kwargs):
+        self.record["queries"].append({"filter": filter or {}})
+        return ProfiledCursor(
+            self.collection.find(filter, *args, **kwargs), self.record
+        )
+
+    def find_one(self, filter=None, *args, **kwargs):
+        self.record["queries"].append({"filter": filter or {}})
+        return self.collection.find_one(filter, *args, **kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        self.record["queries"].append({"pipeline": pipeline})
+        return ProfiledCursor(
+            self.collection.aggregate(pipeline, *args, **kwargs), self.record
+        )
+
+    def count_documents(self, filter, *args, **kwargs):
+        # count_documents runs as this pipeline, so it is explained as one.
+        self.record["queries"].append(
+            {
+                "filter": filter,
+                "pipeline": [
+                    {"$match": filter},
+                    {"$group": {"_id": 1, "n": {"$sum": 1}}},
+                ],
+            }
+        )
+        return self.collection.count_documents(filter, *args, **kwargs)
+
+
+def explain_plan(visitors, query):
+    if "pipeline" not in query:
+        return visitors.find(query["filter"]).explain()
+
+    plan = visitors.database.command(
+        "explain",
+        {"aggregate": visitors.name, "pipeline": query["pipeline"], "cursor": {}},
+        verbosity="executionStats",
+    )
+    # Pipelines that do not run entirely in the query layer report the
+    # plan of their first stage under $cursor.
+    if "stages" in plan:
+        return plan["stages"][0].get("$cursor", {})
+    return plan
+
+
+def explain_query(visitors, query):
+    try:
+        plan = explain_plan(visitors, query)
+    except (PyMongoError, OSError) as error:
+        query["explain_error"] = str(error)
+        return
+
+    execution_stats = plan.get("executionStats", {})
+    query["explain"] = {
+        "winning_plan": plan.get("queryPlanner", {}).get("winningPlan"),
+        "execution_stats": {
+            field: execution_stats[field]
+            for field in EXECUTION_STATS_FIELDS
+            if field in execution_stats
+        },
+    }
+
+
+def execute(record, visitors, operation, *args):
+    # Time spent iterating cursors is reported as decode, not execute.
+    first_query = len(record["queries"])
+    decode_ms_before = record["phases_ms"].get("decode", 0.0)
+    start = time.perf_counter()
+    try:
+        return operation(ProfiledCollection(visitors, record), *args)
+    finally:
+        execute_ms = (time.perf_counter() - start) * 1000
+        decode_ms = record["phases_ms"].get("decode", 0.0) - decode_ms_before
+        add_phase(record, "execute", execute_ms - decode_ms)
+
+        if execute_ms >= profiler.slow_op_ms:
+            start = time.perf_counter()
+            for query in record["queries"][first_query:]:
+                explain_query(visitors, query)
+            record["explain_ms"] = record.get("explain_ms", 0.0) + (
+                (time.perf_counter() - start) * 1000
+            )
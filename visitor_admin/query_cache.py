@@ -0,0 +1,171 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import warnings
+from collections import OrderedDict
+
+
+def make_cache_key(query_name, params):
+    return json.dumps([query_name, params], sort_keys=True, default=str)
+
+
+class QueryCache:
+    def __init__(self, max_bytes=0, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.file_tier_ready = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(os.getenv("VISITOR_ADMIN_CACHE_BYTES", "0")),
+            path=os.getenv("VISITOR_ADMIN_CACHE_PATH"),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 or self.path is not None
+
+    def execute_file_tier(self, statement, parameters=()):
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                return connection.execute(statement, parameters).fetchone()
+        finally:
+            connection.close()
+
+    def setup_file_tier(self):
+        self.execute_file_tier(
+            "CREATE TABLE IF NOT EXISTS generation "
+            "(id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)"
+        )
+        self.execute_file_tier(
+            "INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)"
+        )
+        self.execute_file_tier(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, generation INTEGER NOT NULL, value BLOB NOT NULL)"
+        )
+
+    def use_file_tier(self):
+        # The file is opened on first use, so a bad path cannot break imports.
+        if self.path is None:
+            return False
+
+        if not self.file_tier_ready:
+            try:
+                self.setup_file_tier()
+            except sqlite3.Error as error:
+                warnings.warn(
+                    f"Query cache file {self.path} is unavailable ({error}), "
+                    "caching in memory only",
+                    RuntimeWarning,
+                )
+                with self.lock:
+                    self.path = None
+                    self.entries.clear()
+                    self.size = 0
+                return False
+            self.file_tier_ready = True
+        return True
+
+    def warn_file_tier_error(self, error):
+        warnings.warn(f"Query cache file {self.path} failed: {error}", RuntimeWarning)
+
+    def current_generation(self):
+        if self.use_file_tier():
+            return self.execute_file_tier("SELECT value FROM generation")[0]
+        return self.generation
+
+    def bump_generation(self):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size = 0
+
+        if self.use_file_tier():
+            try:
+                self.execute_file_tier("UPDATE generation SET value = value + 1")
+                self.execute_file_tier(
+                    "DELETE FROM results "
+                    "WHERE generation < (SELECT value FROM generation)"
+                )
+            except sqlite3.Error as error:
+                self.warn_file_tier_error(error)
+
+    def get(self, key, generation):
+        with self.lock:
+            data = self.entries.get((generation, key))
+            if data is not None:
+                self.entries.move_to_end((generation, key))
+                return data
+
+        if self.path is not None:
+            row = self.execute_file_tier(
+                "SELECT value FROM results WHERE key = ? AND generation = ?",
+                (key, generation),
+            )
+            if row is not None:
+                self.set_memory_tier(key, generation, row[0])
+                return row[0]
+        return None
+
+    def set_memory_tier(self, key, generation, data):
+        if len(data) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous_data = self.entries.pop((generation, key), None)
+            if previous_data is not None:
+                self.size -= len(previous_data)
+
+            self.entries[(generation, key)] = data
+            self.size += len(data)
+
+            while self.size > self.max_bytes:
+                _, evicted_data = self.entries.popitem(last=False)
+                self.size -= len(evicted_data)
+
+    def set(self, key, generation, data):
+        self.set_memory_tier(key, generation, data)
+
+        if self.path is not None:
+            try:
+                self.execute_file_tier(
+                    "INSERT OR REPLACE INTO results (key, generation, value) "
+                    "VALUES (?, ?, ?)",
+                    (key, generation, data),
+                )
+            except sqlite3.Error as error:
+                self.warn_file_tier_error(error)
+
+    def get_or_compute(self, query_name, params, compute):
+        if not self.enabled:
+            return compute()
+
+        # The generation is read before computing, so a result that races
+        # with a write is stored under the old generation and never served.
+        # A cache that cannot be read only costs a recomputation.
+        key = make_cache_key(query_name, params)
+        try:
+            generation = self.current_generation()
+            data = self.get(key, generation)
+        except sqlite3.Error as error:
+            self.warn_file_tier_error(error)
+            return compute()
+
+        if data is not None:
+            return pickle.loads(data)
+
+        result = compute()
+        self.set(key, generation, pickle.dumps(result))
+        return result
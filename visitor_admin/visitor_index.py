@@ -1,6 +1,51 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from visitor_admin.mongodb_connection_manager import MongoDBConnectionManager
+from visitor_admin.mongodb_connection_manager import (
+    MongoDBConnectionManager,
+    is_ordered,
+    reads_from_secondaries,
+)
+from visitor_admin.query_cache import QueryCache
+from visitor_admin import profiling
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+VISITOR_FIELDS = (
+    "visitor_name",
+    "visitor_age",
+    "visit_date",
+    "visit_time",
+    "assistant_name",
+    "comments",
+)
+
+NATURAL_KEY_FIELDS = ("visitor_name", "visit_date", "visit_time")
+
+# Server-side copies of validate_string_input and validate_visitor_age. The
+# patterns only approximate validate_date_format and validate_time_format:
+# they check the shape, so an impossible date such as 2021-02-30 still passes.
+# PCRE's $ also matches before a trailing newline, so \z anchors the end.
+VISIT_DATE_PATTERN = r"^\d{4}-(0?[1-9]|1[0-2])-(0?[1-9]|[12]\d|3[01])\z"
+VISIT_TIME_PATTERN = r"^([01]?\d|2[0-3]):[0-5]?\d\z"
+
+VISITOR_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": list(VISITOR_FIELDS),
+        "properties": {
+            "visitor_name": {"bsonType": "string", "minLength": 1},
+            "visitor_age": {"bsonType": ["int", "long"], "minimum": 1},
+            "visit_date": {"bsonType": "string", "pattern": VISIT_DATE_PATTERN},
+            "visit_time": {"bsonType": "string", "pattern": VISIT_TIME_PATTERN},
+            "assistant_name": {"bsonType": "string", "minLength": 1},
+            "comments": {"bsonType": "string", "minLength": 1},
+        },
+    }
+}
+
+query_cache = QueryCache.from_env()
 
 
 def validate_string_input(input_string):
@@ -35,21 +80,68 @@ def validate_time_format(visit_time):
         )
 
 
-def execute_using_visitors(operation, *args):
-    with MongoDBConnectionManager() as visitors:
-        return operation(visitors, *args)
+def execute_profiled(operation, visitors, *args):
+    operation_name = getattr(operation, "__name__", "operation")
+    with profiling.operation(operation_name) as record:
+        if record is None:
+            return operation(visitors, *args)
+        return profiling.execute(record, visitors, operation, *args)
+
+
+def execute_using_visitors(operation, *args, profile=None):
+    operation_name = getattr(operation, "__name__", "operation")
+    with profiling.operation(operation_name):
+        with MongoDBConnectionManager(profile=profile) as visitors:
+            return execute_profiled(operation, visitors, *args)
+
+
+def execute_write_using_visitors(operation, *args, profile=None):
+    try:
+        return execute_using_visitors(operation, *args, profile=profile)
+    finally:
+        query_cache.bump_generation()
+
+
+def run_concurrently(operations, max_workers=8, profile=None, write=True):
+    # MongoClient is thread-safe, so every worker shares one client and its
+    # connection pool. Each operation is profiled in its own thread. The cache
+    # is cleared afterwards unless the caller passes write=False for reads.
+    try:
+        with MongoDBConnectionManager(profile=profile) as visitors:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(execute_profiled, operation, visitors, *args)
+                    for operation, *args in operations
+                ]
+                return [future.result() for future in futures]
+    finally:
+        if write:
+            query_cache.bump_generation()
+
+
+def execute_cached_read(query_name, operation, profile=None):
+    # A read from a lagging secondary would stay cached until the next write,
+    # so those profiles always query MongoDB.
+    compute = functools.partial(execute_using_visitors, operation, profile=profile)
+    if reads_from_secondaries(profile):
+        return compute()
+    return query_cache.get_or_compute(query_name, {"profile": profile}, compute)
+
+
+def missing_visitor_error(visitor_id):
+    return ValueError(
+        f"Visitor: {visitor_id} does not exist, please enter an existing visitor ID"
+    )
 
 
 def check_visitor_exists(visitors, visitor_id):
     if not visitors.find_one({"_id": ObjectId(visitor_id)}):
-        raise ValueError(
-            f"Visitor: {visitor_id} does not exist, please enter an existing visitor ID"
-        )
+        raise missing_visitor_error(visitor_id)
 
 
-def validate_visitor_exists(visitor_id):
+def validate_visitor_exists(visitor_id, profile=None):
     validate_string_input(visitor_id)
-    execute_using_visitors(check_visitor_exists, visitor_id)
+    execute_using_visitors(check_visitor_exists, visitor_id, profile=profile)
 
 
 def create_indexes(visitors):
@@ -61,15 +153,65 @@ def create_indexes(visitors):
     visitors.create_index([("comments", 1)])
 
 
-def create_visitor_indexes():
+def create_natural_key_index(visitors):
+    visitors.create_index(
+        [(field, 1) for field in NATURAL_KEY_FIELDS],
+        unique=True,
+        name="visit_natural_key",
+    )
+
+
+def install_visitor_validator(visitors):
+    database = visitors.database
+
+    if visitors.name in database.list_collection_names():
+        database.command(
+            "collMod",
+            visitors.name,
+            validator=VISITOR_VALIDATOR,
+            validationLevel="strict",
+            validationAction="error",
+        )
+    else:
+        database.create_collection(visitors.name, validator=VISITOR_VALIDATOR)
+
+
+def create_visitor_collection():
+    execute_using_visitors(install_visitor_validator)
+
+
+def create_visitor_indexes(unique_visits=False):
     execute_using_visitors(create_indexes)
+    if unique_visits:
+        execute_using_visitors(create_natural_key_index)
+
+
+def get_natural_key(visitor):
+    return {field: visitor[field] for field in NATURAL_KEY_FIELDS}
+
+
+def describe_visit(visitor):
+    return (
+        f"{visitor['visitor_name']} on {visitor['visit_date']} "
+        f"at {visitor['visit_time']}"
+    )
 
 
 def add_visitor_data(visitors, visitor):
-    visitors.insert_one(visitor)
+    try:
+        visitors.insert_one(visitor)
+    except DuplicateKeyError:
+        raise ValueError(f"Visit: {describe_visit(visitor)} already exists")
 
 
-def create_visitor(
+def upsert_visitor_data(visitors, visitor):
+    result = visitors.update_one(
+        get_natural_key(visitor), {"$set": visitor}, upsert=True
+    )
+    return result.upserted_id is not None
+
+
+def validate_visitor_fields(
     visitor_name, visitor_age, visit_date, visit_time, assistant_name, comments
 ):
     for input_string in [
@@ -85,6 +227,22 @@ def create_visitor(
     validate_date_format(visit_date)
     validate_time_format(visit_time)
 
+
+@profiling.profiled
+def create_visitor(
+    visitor_name,
+    visitor_age,
+    visit_date,
+    visit_time,
+    assistant_name,
+    comments,
+    profile=None,
+):
+    with profiling.phase("validate"):
+        validate_visitor_fields(
+            visitor_name, visitor_age, visit_date, visit_time, assistant_name, comments
+        )
+
     visitor = {
         "visitor_name": visitor_name,
         "visitor_age": visitor_age,
@@ -94,36 +252,207 @@ def create_visitor(
         "comments": comments,
     }
 
-    execute_using_visitors(add_visitor_data, visitor)
+    execute_write_using_visitors(add_visitor_data, visitor, profile=profile)
     return "Visitor has been created successfully"
 
 
+@profiling.profiled
+def upsert_visitor(
+    visitor_name,
+    visitor_age,
+    visit_date,
+    visit_time,
+    assistant_name,
+    comments,
+    profile=None,
+):
+    with profiling.phase("validate"):
+        validate_visitor_fields(
+            visitor_name, visitor_age, visit_date, visit_time, assistant_name, comments
+        )
+
+    visitor = {
+        "visitor_name": visitor_name,
+        "visitor_age": visitor_age,
+        "visit_date": visit_date,
+        "visit_time": visit_time,
+        "assistant_name": assistant_name,
+        "comments": comments,
+    }
+
+    if execute_write_using_visitors(upsert_visitor_data, visitor, profile=profile):
+        return "Visitor has been created successfully"
+    return f"Visit: {describe_visit(visitor)} already exists and has been updated"
+
+
 def get_visitors(visitors):
     return list(visitors.find())
 
 
-def list_visitors():
-    return execute_using_visitors(get_visitors)
+@profiling.profiled
+def list_visitors(profile=None):
+    return execute_cached_read("list_visitors", get_visitors, profile)
+
+
+def stream_visitors(batch_size=100, profile=None):
+    with MongoDBConnectionManager(profile=profile) as visitors:
+        yield from visitors.find().batch_size(batch_size)
+
+
+def build_visitor(visitor_data, validate=True):
+    if not isinstance(visitor_data, dict):
+        raise ValueError(f"Visitor data: '{visitor_data}' must be a dictionary")
+
+    missing_fields = [field for field in VISITOR_FIELDS if field not in visitor_data]
+    if missing_fields:
+        raise ValueError(f"Visitor data is missing fields: {', '.join(missing_fields)}")
+
+    visitor = {field: visitor_data[field] for field in VISITOR_FIELDS}
+    if validate:
+        validate_visitor_fields(**visitor)
+    return visitor
+
+
+def dedupe_visitors(visitors_data):
+    unique_visitors = {}
+    for visitor in visitors_data:
+        natural_key = tuple(get_natural_key(visitor).values())
+        unique_visitors[natural_key] = visitor
+    return list(unique_visitors.values())
+
+
+def add_many_visitor_data(visitors, visitors_data, ordered=True):
+    requests = [
+        UpdateOne(get_natural_key(visitor), {"$set": visitor}, upsert=True)
+        for visitor in visitors_data
+    ]
+    try:
+        return visitors.bulk_write(requests, ordered=ordered)
+    except BulkWriteError as error:
+        write_errors = error.details.get("writeErrors")
+        if write_errors:
+            message = (
+                f"{len(write_errors)} visitors were rejected by the server: "
+                f"{write_errors[0]['errmsg']}. "
+                f"{error.details.get('nUpserted', 0)} visitors were created, "
+                f"{error.details.get('nMatched', 0)} already existed"
+            )
+            # An ordered batch stops at the first rejection.
+            not_attempted = len(requests) - write_errors[-1]["index"] - 1
+            if ordered and not_attempted:
+                message += (
+                    f". The batch stopped at visitor {write_errors[-1]['index']}, "
+                    f"so {not_attempted} later visitors were not attempted"
+                )
+            raise ValueError(message)
+        write_concern_errors = error.details.get("writeConcernErrors")
+        if write_concern_errors:
+            raise ValueError(
+                "The server could not confirm the visitors were written: "
+                f"{write_concern_errors[0]['errmsg']}"
+            )
+        raise
+
+
+@profiling.profiled
+def create_visitors(visitors_data, profile=None, validate=True):
+    with profiling.phase("validate"):
+        new_visitors = dedupe_visitors(
+            build_visitor(visitor_data, validate) for visitor_data in visitors_data
+        )
+
+    if not new_visitors:
+        return "No visitors were created"
+
+    result = execute_write_using_visitors(
+        add_many_visitor_data, new_visitors, is_ordered(profile), profile=profile
+    )
+    return (
+        f"{result.upserted_count} visitors have been created successfully, "
+        f"{result.matched_count} already existed"
+    )
+
+
+def get_visitor_stats(visitors):
+    visits_per_day = visitors.aggregate(
+        [
+            {"$group": {"_id": "$visit_date", "visits": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+    )
+    return {
+        "total_visitors": visitors.count_documents({}),
+        "visits_per_day": {day["_id"]: day["visits"] for day in visits_per_day},
+    }
+
+
+@profiling.profiled
+def visitor_stats(profile=None):
+    return execute_cached_read("visitor_stats", get_visitor_stats, profile)
 
 
 def get_visitor_details(visitors, visitor_id):
-    return dict(visitors.find_one({"_id": ObjectId(visitor_id)}))
+    # With a secondary read preference the lookup may reach a member that
+    # has not caught up with the one that answered validate_visitor_exists.
+    visitor = visitors.find_one({"_id": ObjectId(visitor_id)})
+    if not visitor:
+        raise missing_visitor_error(visitor_id)
+    return dict(visitor)
+
+
+@profiling.profiled
+def visitor_details(visitor_id, profile=None):
+    validate_visitor_exists(visitor_id, profile)
+    return execute_using_visitors(get_visitor_details, visitor_id, profile=profile)
+
+
+def get_many_visitor_details(visitors, visitor_ids):
+    object_ids = [ObjectId(visitor_id) for visitor_id in visitor_ids]
+    found_visitors = {
+        visitor["_id"]: visitor
+        for visitor in visitors.find({"_id": {"$in": object_ids}})
+    }
+
+    missing_ids = [
+        visitor_id
+        for visitor_id, object_id in zip(visitor_ids, object_ids)
+        if object_id not in found_visitors
+    ]
+    if missing_ids:
+        raise ValueError(
+            f"Visitors: {', '.join(missing_ids)} do not exist, "
+            "please enter existing visitor IDs"
+        )
+
+    return [dict(found_visitors[object_id]) for object_id in object_ids]
 
 
-def visitor_details(visitor_id):
-    validate_visitor_exists(visitor_id)
-    return execute_using_visitors(get_visitor_details, visitor_id)
+@profiling.profiled
+def visitor_details_many(visitor_ids, profile=None):
+    if not isinstance(visitor_ids, list):
+        raise ValueError(f"Visitor IDs: '{visitor_ids}' must be a list")
+
+    with profiling.phase("validate"):
+        for visitor_id in visitor_ids:
+            validate_string_input(visitor_id)
+
+    if not visitor_ids:
+        return []
+
+    return execute_using_visitors(
+        get_many_visitor_details, visitor_ids, profile=profile
+    )
 
 
 def delete_all_visitors(visitors):
     visitors.delete_many({})
 
 
-def delete_all():
+def delete_all(profile=None):
     confirmation = input("Are you sure you want to delete all visitors? (yes/no): ")
 
     if confirmation.lower() == "yes":
-        execute_using_visitors(delete_all_visitors)
+        execute_write_using_visitors(delete_all_visitors, profile=profile)
         return "All visitors have been deleted"
     else:
         return "No visitors were deleted"
@@ -133,14 +462,14 @@ def delete_single_visitor(visitors, visitor_id):
     visitors.delete_one({"_id": ObjectId(visitor_id)})
 
 
-def delete_visitor(visitor_id):
-    validate_visitor_exists(visitor_id)
+def delete_visitor(visitor_id, profile=None):
+    validate_visitor_exists(visitor_id, profile)
     confirmation = input(
         f"Are you sure you want to delete this visitor: {visitor_id}? (yes/no): "
     )
 
     if confirmation.lower() == "yes":
-        execute_using_visitors(delete_single_visitor, visitor_id)
+        execute_write_using_visitors(delete_single_visitor, visitor_id, profile=profile)
         return f"Visitor: {visitor_id} has been deleted"
     else:
         return "No visitors were deleted"
@@ -150,24 +479,28 @@ def update_single_visitor(visitors, search_criteria, info_update):
     visitors.update_one(search_criteria, info_update)
 
 
-def update_visitor(visitor_id, new_info):
-    validate_visitor_exists(visitor_id)
+@profiling.profiled
+def update_visitor(visitor_id, new_info, profile=None):
+    validate_visitor_exists(visitor_id, profile)
 
     if not isinstance(new_info, dict):
         raise ValueError(f"Update data: '{new_info}' must be a dictionary")
 
-    for field_name, info in new_info.items():
-        if field_name == "visitor_age":
-            validate_visitor_age(info)
-        else:
-            validate_string_input(info)
-            if field_name == "visit_date":
-                validate_date_format(info)
-            elif field_name == "visit_time":
-                validate_time_format(info)
+    with profiling.phase("validate"):
+        for field_name, info in new_info.items():
+            if field_name == "visitor_age":
+                validate_visitor_age(info)
+            else:
+                validate_string_input(info)
+                if field_name == "visit_date":
+                    validate_date_format(info)
+                elif field_name == "visit_time":
+                    validate_time_format(info)
 
     search_criteria = {"_id": ObjectId(visitor_id)}
     info_update = {"$set": new_info}
 
-    execute_using_visitors(update_single_visitor, search_criteria, info_update)
+    execute_write_using_visitors(
+        update_single_visitor, search_criteria, info_update, profile=profile
+    )
     return f"Visitor: {visitor_id} has been updated successfully"